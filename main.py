@@ -1,5 +1,15 @@
-from src.cli import ZerePyCLI
+import sys
+from src.cli import ZerePyCLI, sniff_subcommand
 
 if __name__ == "__main__":
-    cli = ZerePyCLI()
-    cli.main_loop()
+    if "--daemon" in sys.argv[1:]:
+        from src.daemon import serve
+        serve()
+        sys.exit(0)
+
+    command = sniff_subcommand(sys.argv[1:])
+    if command:
+        ZerePyCLI(command=command).run_once(sys.argv[1:])
+    else:
+        cli = ZerePyCLI()
+        cli.run(load_default_agent="--no-default-agent" not in sys.argv[1:])
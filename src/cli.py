@@ -1,17 +1,92 @@
+# Keep this module's imports cheap: main.py imports it for every invocation,
+# including one-shot commands that are forwarded to the daemon. prompt_toolkit,
+# asyncio and src.agent (which pulls in every connection SDK) are imported
+# where they're first needed, please don't move them back up here.
 import sys
 import json
 import logging
 import os
+from collections import defaultdict
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Callable, Dict, List
+from functools import lru_cache, wraps
+from operator import attrgetter
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, FrozenSet, Iterator, List, Optional, Tuple
 from pathlib import Path
-from prompt_toolkit import PromptSession
-from prompt_toolkit.completion import WordCompleter
-from prompt_toolkit.styles import Style
-from prompt_toolkit.formatted_text import HTML
-from prompt_toolkit.history import FileHistory
-from src.agent import ZerePyAgent
-from src.helpers import print_h_bar
+from src.helpers import H_BAR, print_h_bar
+
+if TYPE_CHECKING:
+    import asyncio
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.formatted_text import HTML
+    from prompt_toolkit.styles import Style
+    from src.completer import CommandCompleter
+
+# orjson is optional, general.json is read/written with the stdlib when it's missing
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+
+    def _json_dumps(data: dict) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(data: dict) -> bytes:
+        return json.dumps(data, indent=2).encode()
+
+# Agent definitions and the general.json that names the default agent,
+# relative to the working directory like the agent loader expects
+_AGENTS_DIR = Path("agents")
+_GENERAL_CONFIG_PATH = _AGENTS_DIR / "general.json"
+
+# Parsed general.json files and the mtime they were read at
+_general_config_cache: Dict[Path, Tuple[int, dict]] = {}
+
+def _read_general_config(path: Path) -> dict:
+    """Parse general.json, reusing the previous parse while the file is unchanged"""
+    mtime = path.stat().st_mtime_ns
+    cached = _general_config_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, _json_loads(path.read_bytes()))
+        _general_config_cache[path] = cached
+    return cached[1]
+
+def _write_general_config(path: Path, data: dict) -> None:
+    """Write general.json and keep the cached parse in sync with it"""
+    import tempfile
+
+    # Write next to the file and swap it in, so an interrupted write can't
+    # leave a truncated general.json behind
+    with tempfile.NamedTemporaryFile('wb', dir=path.parent, prefix=f".{path.name}.", delete=False) as tmp:
+        tmp.write(_json_dumps(data))
+    try:
+        # The temporary file is created private, keep the original permissions
+        os.chmod(tmp.name, path.stat().st_mode & 0o777)
+        os.replace(tmp.name, path)
+    except OSError:
+        os.unlink(tmp.name)
+        raise
+    _general_config_cache[path] = (path.stat().st_mtime_ns, data)
+
+# Agent names in agents/ and the directory mtime they were listed at
+_agent_names_cache: Optional[Tuple[int, Tuple[str, ...]]] = None
+
+def _list_agent_names() -> Tuple[str, ...]:
+    """Sorted names of the agent files in agents/, general.json excluded"""
+    global _agent_names_cache
+
+    # Adding, removing or renaming a file bumps the directory's mtime
+    mtime = _AGENTS_DIR.stat().st_mtime_ns
+    if _agent_names_cache is None or _agent_names_cache[0] != mtime:
+        with os.scandir(_AGENTS_DIR) as entries:
+            agent_names = tuple(sorted(
+                entry.name[:-5] for entry in entries
+                if entry.name.endswith(".json") and entry.name != _GENERAL_CONFIG_PATH.name and entry.is_file()
+            ))
+        _agent_names_cache = (mtime, agent_names)
+    return _agent_names_cache[1]
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(message)s')
@@ -30,202 +105,406 @@ class Command:
         if self.aliases is None:
             self.aliases = []
 
+_WELCOME_BANNER = "\n".join((
+    H_BAR,
+    "👋 Welcome to the ZerePy CLI!",
+    "Type 'help' for a list of commands.",
+))
+
+# Static command metadata: (name, description, tips, handler method name, aliases)
+_COMMAND_SPECS = (
+    ("help",
+     "Displays a list of all available commands, or help for a specific command.",
+     ["Try 'help' to see available commands.",
+      "Try 'help {command}' to get more information about a specific command."],
+     "help", ['h', '?']),
+    ("clear",
+     "Clears the terminal screen.",
+     ["Use this command to clean up your terminal view"],
+     "clear_screen", ['cls']),
+
+    ################## AGENTS ##################
+    ("agent-action",
+     "Runs a single agent action.",
+     ["Format: agent-action {connection} {action}",
+      "Use 'list-connections' to see available connections.",
+      "Use 'list-actions' to see available actions."],
+     "agent_action", ['action', 'run']),
+    ("agent-loop",
+     "Starts the current agent's autonomous behavior loop.",
+     ["Press Ctrl+C to stop the loop"],
+     "agent_loop", ['loop', 'start']),
+    ("list-agents",
+     "Lists all available agents you have on file.",
+     ["Agents are stored in the 'agents' directory",
+      "Use 'load-agent' to load an available agent"],
+     "list_agents", ['agents', 'ls-agents']),
+    ("load-agent",
+     "Loads an agent from a file.",
+     ["Format: load-agent {agent_name}",
+      "Use 'list-agents' to see available agents"],
+     "load_agent", ['load']),
+    ("create-agent",
+     "Creates a new agent.",
+     ["Follow the interactive wizard to create a new agent"],
+     "create_agent", ['new-agent', 'create']),
+    ("set-default-agent",
+     "Define which model is loaded when the CLI starts.",
+     ["You can also just change the 'default_agent' field in agents/general.json"],
+     "set_default_agent", ['default']),
+    ("chat",
+     "Start a chat session with the current agent",
+     ["Use 'exit' to end the chat session"],
+     "chat_session", ['talk']),
+
+    ################## CONNECTIONS ##################
+    ("list-actions",
+     "Lists all available actions for the given connection.",
+     ["Format: list-actions {connection}",
+      "Use 'list-connections' to see available connections"],
+     "list_actions", ['actions', 'ls-actions']),
+    ("configure-connection",
+     "Sets up a connection for API access.",
+     ["Format: configure-connection {connection}",
+      "Follow the prompts to enter necessary credentials"],
+     "configure_connection", ['config', 'setup']),
+    ("list-connections",
+     "Lists all available connections.",
+     ["Shows both configured and unconfigured connections"],
+     "list_connections", ['connections', 'ls-connections']),
+
+    ################## MISC ##################
+    ("exit",
+     "Exits the ZerePy CLI.",
+     ["You can also use Ctrl+D to exit"],
+     "exit", ['quit', 'q']),
+)
+
+# One-shot commands that don't need the default agent loaded first
+_AGENTLESS_COMMANDS = frozenset({
+    "help", "clear", "list-agents", "load-agent", "create-agent", "set-default-agent", "exit"
+})
+
+# Interactive commands that can run while the default agent is still loading,
+# load-agent waits so the background load can't replace the agent it loads
+_LOADER_INDEPENDENT_COMMANDS = _AGENTLESS_COMMANDS - {"load-agent"}
+
+@lru_cache(maxsize=1)
+def _get_style() -> "Style":
+    """The prompt style only depends on constants, so it is parsed once per process"""
+    from prompt_toolkit.styles import Style
+
+    return Style.from_dict({
+        'prompt': 'ansicyan bold',
+        'command': 'ansigreen',
+        'error': 'ansired bold',
+        'success': 'ansigreen bold',
+        'warning': 'ansiyellow',
+    })
+
+@lru_cache(maxsize=1)
+def _enable_windows_ansi() -> bool:
+    """Enable ANSI escape processing on the Windows console, returns whether it is available"""
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+        mode = ctypes.c_uint32()
+        if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            return False
+        # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+        return bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))
+    except Exception:
+        return False
+
+def _trigrams(word: str) -> FrozenSet[str]:
+    """Character trigrams of word, padded so short words and word edges still count"""
+    padded = f"^^{word}$$"
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+@lru_cache(maxsize=1)
+def _get_trigram_index(keys: Tuple[str, ...]) -> Tuple[Dict[str, List[str]], Dict[str, int]]:
+    """Map each trigram to the command names/aliases containing it, plus each key's trigram count"""
+    postings = defaultdict(list)
+    trigram_counts = {}
+    for key in keys:
+        trigrams = _trigrams(key)
+        trigram_counts[key] = len(trigrams)
+        for trigram in trigrams:
+            postings[trigram].append(key)
+    return dict(postings), trigram_counts
+
+@lru_cache(maxsize=128)
+def _suggest(
+    command: str,
+    names: Tuple[str, ...],
+    alias_pairs: Tuple[Tuple[str, str], ...],
+    max_suggestions: int
+) -> Tuple[str, ...]:
+    """
+    Suggest command names for an unknown command, memoized since typos tend to repeat
+
+    Args:
+        command (str): The unknown command as typed
+        names (tuple): Sorted canonical command names
+        alias_pairs (tuple): (alias, command name) pairs
+        max_suggestions (int): Maximum number of names to return
+    """
+    prefix_matches = [name for name in names if name.startswith(command)]
+    if prefix_matches:
+        return tuple(prefix_matches[:max_suggestions])
+
+    # Rank names and aliases sharing trigrams with the input by Jaccard similarity
+    aliases = dict(alias_pairs)
+    keys = (*names, *aliases)
+    postings, trigram_counts = _get_trigram_index(keys)
+    query = _trigrams(command)
+    shared = defaultdict(int)
+    for trigram in query:
+        for key in postings.get(trigram, ()):
+            shared[key] += 1
+    scores = {
+        key: count / (len(query) + trigram_counts[key] - count)
+        for key, count in shared.items()
+    }
+    matches = sorted((key for key, score in scores.items() if score >= 0.3), key=scores.get, reverse=True)
+
+    if not matches:
+        # Fall back to basic string similarity for short typos the trigrams miss
+        from difflib import get_close_matches
+        matches = get_close_matches(command, keys, n=max_suggestions, cutoff=0.6)
+
+    # Report aliases by their command name
+    return tuple(dict.fromkeys(aliases.get(match, match) for match in matches))[:max_suggestions]
+
+# Interactive or long-running commands that must not be sent to the daemon,
+# configure-connection prompts for credentials on stdin
+_LOCAL_ONLY_COMMANDS = frozenset({"chat", "agent-loop", "configure-connection"})
+
+def _requires_agent(handler: Callable) -> Callable:
+    """Decorator for command handlers that can't run without a loaded agent"""
+    @wraps(handler)
+    def wrapper(self, input_list: List[str]) -> None:
+        if self.agent is None:
+            logger.info("No agent is currently loaded. Use 'load-agent' to load an agent.")
+            return
+        return handler(self, input_list)
+    return wrapper
+
+@contextmanager
+def _event_loop() -> Iterator["asyncio.AbstractEventLoop"]:
+    """
+    Provide a fresh event loop, shut down like asyncio.run() does on exit
+
+    asyncio.run() installs its own SIGINT handler on Python 3.11+, which
+    cancels the main task instead of raising KeyboardInterrupt inside
+    blocking handlers such as agent-loop, so the loop is driven directly.
+    """
+    # asyncio is most of the CLI's import time, commands forwarded to the
+    # daemon never get this far
+    import asyncio
+
+    loop = asyncio.new_event_loop()
+    try:
+        yield loop
+    finally:
+        try:
+            # Finish off whatever is still pending (exit() raises SystemExit
+            # mid-session, leaving prompt_toolkit's history loader and the
+            # background agent load behind)
+            tasks = asyncio.all_tasks(loop)
+            if tasks:
+                for task in tasks:
+                    task.cancel()
+                loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            loop.close()
+
+def run_coroutine(coroutine: Awaitable) -> Any:
+    """Run a coroutine to completion on a fresh event loop"""
+    with _event_loop() as loop:
+        return loop.run_until_complete(coroutine)
+
+def _split_args(args_string: str) -> List[str]:
+    """Split command arguments, keeping quoted phrases together"""
+    # shlex only when there are quotes to honor, plain split is much cheaper
+    if "'" in args_string or '"' in args_string:
+        import shlex
+        try:
+            return shlex.split(args_string)
+        except ValueError:
+            # Unbalanced quotes, e.g. an apostrophe in free text
+            pass
+    return args_string.split()
+
+@contextmanager
+def _patch_output() -> Iterator[None]:
+    """Route print and log output through prompt_toolkit so it's drawn above an active prompt"""
+    from prompt_toolkit.patch_stdout import patch_stdout
+
+    stdout, stderr = sys.stdout, sys.stderr
+    # Logging handlers hold on to the stream they were created with, so they
+    # have to be pointed at the proxies explicitly
+    handlers = [
+        handler for handler in logging.getLogger().handlers
+        if isinstance(handler, logging.StreamHandler) and handler.stream in (stdout, stderr)
+    ]
+    original_streams = [handler.stream for handler in handlers]
+
+    with patch_stdout(raw=True):
+        for handler in handlers:
+            handler.setStream(sys.stdout if handler.stream is stdout else sys.stderr)
+        try:
+            yield
+        finally:
+            for handler, stream in zip(handlers, original_streams):
+                handler.setStream(stream)
+
+def sniff_subcommand(argv: List[str]) -> Optional[str]:
+    """Return the first non-flag token of argv, or None for an interactive run"""
+    for token in argv:
+        if not token.startswith("-"):
+            return token.lower()
+    return None
+
 class ZerePyCLI:
-    def __init__(self):
+    # Command and alias registries shared by all instances, built on first use
+    _commands_template: Optional[Tuple[Dict[str, Command], Dict[str, str]]] = None
+    # Rendered general help, built on first use
+    _general_help: Optional[str] = None
+
+    # Every instance attribute, style/completer/sessions are only set by
+    # _setup_prompt_toolkit
+    __slots__ = (
+        "agent", "session", "chat_prompt_session", "style", "completer",
+        "config_dir", "commands", "aliases", "_command_names", "_alias_pairs", "_dispatch",
+        "_prompt_message", "_agent_loader",
+    )
+
+    def __init__(self, command: Optional[str] = None, interactive: bool = True):
+        """
+        Args:
+            command (str): When set, only this command is registered and the
+                        interactive prompt is not built (one-shot invocation)
+            interactive (bool): Whether to build the interactive prompt when
+                        every command is registered
+        """
         self.agent = None
+        self.session = None
+        self.chat_prompt_session = None
+        # (agent name, prompt) for the agent the prompt was last rendered for
+        self._prompt_message: Optional[Tuple[Optional[str], "HTML"]] = None
+        # Background load of the default agent started by main_loop
+        self._agent_loader: Optional[Awaitable] = None
         
-        # Create config directory if it doesn't exist
+        # Created on demand, only interactive sessions write to it
         self.config_dir = Path.home() / '.zerepy'
-        self.config_dir.mkdir(exist_ok=True)
         
         # Initialize command registry
-        self._initialize_commands()
-        
-        # Setup prompt toolkit components
-        self._setup_prompt_toolkit()
-
-    def _initialize_commands(self) -> None:
-        """Initialize all CLI commands"""
         self.commands: Dict[str, Command] = {}
-        
-        # Help command
-        self._register_command(
-            Command(
-                name="help",
-                description="Displays a list of all available commands, or help for a specific command.",
-                tips=["Try 'help' to see available commands.",
-                      "Try 'help {command}' to get more information about a specific command."],
-                handler=self.help,
-                aliases=['h', '?']
-            )
-        )
+        self.aliases: Dict[str, str] = {}
+        if command is None or not self._register_single_command(command):
+            self._initialize_commands()
+        self._command_names = tuple(sorted(self.commands))
+        self._alias_pairs = tuple(self.aliases.items())
 
-        # Clear command
-        self._register_command(
-            Command(
-                name="clear",
-                description="Clears the terminal screen.",
-                tips=["Use this command to clean up your terminal view"],
-                handler=self.clear_screen,
-                aliases=['cls']
-            )
-        )
-        
-        ################## AGENTS ################## 
-        # Agent action command
-        self._register_command(
-            Command(
-                name="agent-action",
-                description="Runs a single agent action.",
-                tips=["Format: agent-action {connection} {action}",
-                      "Use 'list-connections' to see available connections.",
-                      "Use 'list-actions' to see available actions."],
-                handler=self.agent_action,
-                aliases=['action', 'run']
-            )
-        )
-        
-        # Agent loop command
-        self._register_command(
-            Command(
-                name="agent-loop",
-                description="Starts the current agent's autonomous behavior loop.",
-                tips=["Press Ctrl+C to stop the loop"],
-                handler=self.agent_loop,
-                aliases=['loop', 'start']
-            )
-        )
-        
-        # List agents command
-        self._register_command(
-            Command(
-                name="list-agents",
-                description="Lists all available agents you have on file.",
-                tips=["Agents are stored in the 'agents' directory",
-                      "Use 'load-agent' to load an available agent"],
-                handler=self.list_agents,
-                aliases=['agents', 'ls-agents']
-            )
-        )
-        
-        # Load agent command
-        self._register_command(
-            Command(
-                name="load-agent",
-                description="Loads an agent from a file.",
-                tips=["Format: load-agent {agent_name}",
-                      "Use 'list-agents' to see available agents"],
-                handler=self.load_agent,
-                aliases=['load']
-            )
-        )
-        
-        # Create agent command
-        self._register_command(
-            Command(
-                name="create-agent",
-                description="Creates a new agent.",
-                tips=["Follow the interactive wizard to create a new agent"],
-                handler=self.create_agent,
-                aliases=['new-agent', 'create']
-            )
-        )
-        
-        # Define default agent
-        self._register_command(
-            Command(
-                name="set-default-agent",
-                description="Define which model is loaded when the CLI starts.",
-                tips=["You can also just change the 'default_agent' field in agents/general.json"],
-                handler=self.set_default_agent,
-                aliases=['default']
-            )
-        )
+        # Flat name/alias -> command table so dispatch is a single dict probe
+        self._dispatch: Dict[str, Command] = dict(self.commands)
+        for alias, command_name in self.aliases.items():
+            self._dispatch[alias] = self.commands[command_name]
 
-        # Chat command
-        self._register_command(
-            Command(
-                name="chat",
-                description="Start a chat session with the current agent",
-                tips=["Use 'exit' to end the chat session"],
-                handler=self.chat_session,
-                aliases=['talk']
-            )
-        )
-        
-        ################## CONNECTIONS ################## 
-        # List actions command
-        self._register_command(
-            Command(
-                name="list-actions",
-                description="Lists all available actions for the given connection.",
-                tips=["Format: list-actions {connection}",
-                      "Use 'list-connections' to see available connections"],
-                handler=self.list_actions,
-                aliases=['actions', 'ls-actions']
-            )
-        )
-        
-        # Configure connection command
-        self._register_command(
-            Command(
-                name="configure-connection",
-                description="Sets up a connection for API access.",
-                tips=["Format: configure-connection {connection}",
-                      "Follow the prompts to enter necessary credentials"],
-                handler=self.configure_connection,
-                aliases=['config', 'setup']
-            )
-        )
-        
-        # List connections command
-        self._register_command(
-            Command(
-                name="list-connections",
-                description="Lists all available connections.",
-                tips=["Shows both configured and unconfigured connections"],
-                handler=self.list_connections,
-                aliases=['connections', 'ls-connections']
-            )
-        )
-        
-        ################## MISC ################## 
-        # Exit command
-        self._register_command(
-            Command(
-                name="exit",
-                description="Exits the ZerePy CLI.",
-                tips=["You can also use Ctrl+D to exit"],
-                handler=self.exit,
-                aliases=['quit', 'q']
-            )
+        if command is None and interactive:
+            # Setup prompt toolkit components
+            self._setup_prompt_toolkit()
+
+    def _initialize_commands(self) -> None:
+        """Initialize all CLI commands"""
+        # Handlers are stored unbound, so the registry built for the first
+        # instance can be shared by every later one
+        if ZerePyCLI._commands_template is None:
+            for spec in _COMMAND_SPECS:
+                self._register_command(self._command_from_spec(spec))
+            ZerePyCLI._commands_template = (dict(self.commands), dict(self.aliases))
+        else:
+            commands, aliases = ZerePyCLI._commands_template
+            self.commands.update(commands)
+            self.aliases.update(aliases)
+
+    def _register_single_command(self, command_name: str) -> bool:
+        """Register only the command matching command_name, returns False if the full registry is needed"""
+        for spec in _COMMAND_SPECS:
+            if command_name == spec[0] or command_name in spec[4]:
+                # help describes every other command, so it needs all of them
+                if spec[0] == "help":
+                    return False
+                self._register_command(self._command_from_spec(spec))
+                return True
+        return False
+
+    @classmethod
+    def _command_from_spec(cls, spec: tuple) -> Command:
+        name, description, tips, handler_name, aliases = spec
+        return Command(
+            name=name,
+            description=description,
+            tips=tips,
+            handler=getattr(cls, handler_name),
+            aliases=aliases
         )
 
     def _setup_prompt_toolkit(self) -> None:
         """Setup prompt toolkit components"""
-        self.style = Style.from_dict({
-            'prompt': 'ansicyan bold',
-            'command': 'ansigreen',
-            'error': 'ansired bold',
-            'success': 'ansigreen bold',
-            'warning': 'ansiyellow',
-        })
-
-        # Use FileHistory for persistent command history
-        history_file = self.config_dir / 'history.txt'
-        
-        self.completer = WordCompleter(
-            list(self.commands.keys()), 
-            ignore_case=True,
-            sentence=True
-        )
+        from prompt_toolkit import PromptSession
+        from prompt_toolkit.history import FileHistory
+        from prompt_toolkit.key_binding import KeyBindings
+
+        self.style = _get_style()
+
+        # Use FileHistory for persistent command history, unless input is piped in
+        history = None
+        if sys.stdin.isatty():
+            self.config_dir.mkdir(exist_ok=True)
+            history = FileHistory(str(self.config_dir / 'history.txt'))
+
+        # Only canonical names are offered, aliases would just double the list
+        self.completer = self._build_completer()
         
+        # Ctrl+C at the command prompt just clears the line instead of
+        # raising KeyboardInterrupt out of prompt_async
+        key_bindings = KeyBindings()
+
+        @key_bindings.add('c-c')
+        def _(event):
+            event.app.current_buffer.reset()
+
         self.session = PromptSession(
             completer=self.completer,
             style=self.style,
-            history=FileHistory(str(history_file))
+            history=history,
+            key_bindings=key_bindings
         )
 
+    def _build_completer(self) -> "CommandCompleter":
+        """Complete command names, and agent, connection or command names as their first argument"""
+        from src.completer import CommandCompleter
+
+        words_by_command = {
+            "help": lambda: list(self._command_names),
+            "load-agent": self._get_agent_names,
+            "set-default-agent": self._get_agent_names,
+            "agent-action": self._get_connection_names,
+            "list-actions": self._get_connection_names,
+            "configure-connection": self._get_connection_names,
+        }
+        # Aliases complete their arguments like the command they stand for
+        argument_words = {
+            key: words_by_command[command.name]
+            for key, command in self._dispatch.items()
+            if command.name in words_by_command
+        }
+        return CommandCompleter(self._command_names, argument_words)
+
     ###################
     # Helper Functions
     ###################
@@ -233,43 +512,94 @@ class ZerePyCLI:
         """Register a command and its aliases"""
         self.commands[command.name] = command
         for alias in command.aliases:
-            self.commands[alias] = command
+            self.aliases[alias] = command.name
+
+    def _get_command(self, command_name: str) -> Optional[Command]:
+        """Look up a command by its name or one of its aliases"""
+        return self._dispatch.get(command_name)
+
+    def _get_chat_prompt_session(self) -> "PromptSession":
+        """Get the chat prompt session, built on the first chat rather than at startup"""
+        if self.chat_prompt_session is None:
+            from prompt_toolkit import PromptSession
+
+            # Chat messages get their own session so they don't end up in the
+            # command history file or get completed against command names.
+            # Free-form text has nothing to complete or search, so keystrokes
+            # only ever update the buffer
+            self.chat_prompt_session = PromptSession(
+                style=_get_style(),
+                complete_while_typing=False,
+                enable_history_search=False,
+                auto_suggest=None
+            )
+        return self.chat_prompt_session
 
-    def _get_prompt_message(self) -> HTML:
-        """Generate the prompt message based on current state"""
-        agent_status = f"({self.agent.name})" if self.agent else "(no agent)"
-        return HTML(f'<prompt>ZerePy-CLI</prompt> {agent_status} > ')
+    def _get_agent_names(self) -> List[str]:
+        try:
+            return list(_list_agent_names())
+        except FileNotFoundError:
+            return []
+
+    def _get_connection_names(self) -> List[str]:
+        return list(self.agent.connection_manager.connections) if self.agent else []
+
+    def _get_prompt_message(self) -> "HTML":
+        """Generate the prompt message based on current state, cached until the agent changes"""
+        # Called on every redraw, so the HTML is only rebuilt when the agent's name differs
+        agent_name = self.agent.name if self.agent else None
+        if self._prompt_message is None or self._prompt_message[0] != agent_name:
+            from prompt_toolkit.formatted_text import HTML
+
+            agent_status = f"({agent_name})" if agent_name else "(no agent)"
+            self._prompt_message = (agent_name, HTML(f'<prompt>ZerePy-CLI</prompt> {agent_status} > '))
+        return self._prompt_message[1]
+
+    def _handle_command(
+        self,
+        command_string: str,
+        args_string: str = "",
+        run_async: Callable[[Awaitable], Any] = run_coroutine
+    ) -> None:
+        """
+        Handle a command given its name and the rest of the input line
 
-    def _handle_command(self, input_string: str) -> None:
-        """Parse and handle a command input"""
-        input_list = input_string.split()
-        command_string = input_list[0].lower()
+        Handlers run synchronously on the calling thread with no event loop
+        running, so Ctrl+C interrupts them and they're free to call
+        asyncio.run() themselves (the Solana actions do). Handlers that are
+        coroutines, like chat, are run with run_async.
+        """
+        command_string = command_string.lower()
 
         try:
-            command = self.commands.get(command_string)
+            command = self._get_command(command_string)
             if command:
-                command.handler(input_list)
+                # Arguments are only tokenized once the command is known to exist
+                input_list = [command_string, *_split_args(args_string)]
+                result = command.handler(self, input_list)
+                # Duck-typed rather than inspect.isawaitable, inspect is slow to import
+                if hasattr(result, "__await__"):
+                    run_async(result)
             else:
                 self._handle_unknown_command(command_string)
         except Exception as e:
-            logger.error(f"Error executing command: {e}")
+            logger.error("Error executing command: %s", e)
 
     def _handle_unknown_command(self, command: str) -> None:
         """Handle unknown command with suggestions"""
-        logger.warning(f"Unknown command: '{command}'") 
+        logger.warning("Unknown command: '%s'", command) 
 
         # Suggest similar commands using basic string similarity
         suggestions = self._get_command_suggestions(command)
         if suggestions:
             logger.info("Did you mean one of these?")
             for suggestion in suggestions:
-                logger.info(f"  - {suggestion}")
+                logger.info("  - %s", suggestion)
         logger.info("Use 'help' to see all available commands.")
 
     def _get_command_suggestions(self, command: str, max_suggestions: int = 3) -> List[str]:
-        """Get command suggestions based on string similarity"""
-        from difflib import get_close_matches
-        return get_close_matches(command, self.commands.keys(), n=max_suggestions, cutoff=0.6)
+        """Get command suggestions, preferring commands that start with the input"""
+        return list(_suggest(command, self._command_names, self._alias_pairs, max_suggestions))
 
     def _print_welcome_message(self, clearing: bool = False) -> None:
         """Print welcome message and initial status
@@ -278,78 +608,75 @@ class ZerePyCLI:
             clearing (bool): Whether this is being called during a screen clear
                         When True, skips the final horizontal bar to avoid doubles
         """
-        print_h_bar()
-        logger.info("👋 Welcome to the ZerePy CLI!")
-        logger.info("Type 'help' for a list of commands.")
-        if not clearing:
-            print_h_bar()
+        logger.info(_WELCOME_BANNER if clearing else f"{_WELCOME_BANNER}\n{H_BAR}")
 
     def _show_command_help(self, command_name: str) -> None:
         """Show help for a specific command"""
-        command = self.commands.get(command_name)
+        command = self._get_command(command_name)
         if not command:
-            logger.warning(f"Unknown command: '{command_name}'")
+            logger.warning("Unknown command: '%s'", command_name)
             suggestions = self._get_command_suggestions(command_name)
             if suggestions:
                 logger.info("Did you mean one of these?")
                 for suggestion in suggestions:
-                    logger.info(f"  - {suggestion}")
+                    logger.info("  - %s", suggestion)
             return
 
-        logger.info(f"\nHelp for '{command.name}':")
-        logger.info(f"Description: {command.description}")
+        lines = [f"\nHelp for '{command.name}':", f"Description: {command.description}"]
         
         if command.aliases:
-            logger.info(f"Aliases: {', '.join(command.aliases)}")
+            lines.append(f"Aliases: {', '.join(command.aliases)}")
         
         if command.tips:
-            logger.info("\nTips:")
-            for tip in command.tips:
-                logger.info(f"  - {tip}")
+            lines.append("\nTips:")
+            lines.extend(f"  - {tip}" for tip in command.tips)
+
+        logger.info("\n".join(lines))
 
     def _show_general_help(self) -> None:
         """Show general help information"""
-        logger.info("\nAvailable Commands:")
-        # Group commands by first letter for better organization
-        commands_by_letter = {}
-        for cmd_name, cmd in self.commands.items():
-            # Only show main commands, not aliases
-            if cmd_name == cmd.name:
-                first_letter = cmd_name[0].upper()
-                if first_letter not in commands_by_letter:
-                    commands_by_letter[first_letter] = []
-                commands_by_letter[first_letter].append(cmd)
-
-        for letter in sorted(commands_by_letter.keys()):
-            logger.info(f"\n{letter}:")
-            for cmd in sorted(commands_by_letter[letter], key=lambda x: x.name):
-                logger.info(f"  {cmd.name:<15} - {cmd.description}")
+        # The command set never changes, so the text is rendered once and
+        # shared by every instance
+        if ZerePyCLI._general_help is None:
+            # Group commands by first letter for better organization
+            commands_by_letter = defaultdict(list)
+            for cmd in self.commands.values():
+                commands_by_letter[cmd.name[:1].upper()].append(cmd)
+
+            lines = ["\nAvailable Commands:"]
+            for letter in sorted(commands_by_letter):
+                lines.append(f"\n{letter}:")
+                for cmd in sorted(commands_by_letter[letter], key=attrgetter('name')):
+                    lines.append(f"  {cmd.name:<15} - {cmd.description}")
+            ZerePyCLI._general_help = "\n".join(lines)
+
+        logger.info(ZerePyCLI._general_help)
 
     def _list_loaded_agent(self) -> None:
         if self.agent:
-            logger.info(f"\nStart the agent loop with the command 'start' or use one of the action commands.")
+            logger.info("\nStart the agent loop with the command 'start' or use one of the action commands.")
         else:
-            logger.info(f"\nNo default agent is loaded, please use the load-agent command to do that.")
+            logger.info("\nNo default agent is loaded, please use the load-agent command to do that.")
 
     def _load_agent_from_file(self, agent_name):
         try: 
+            # The agent pulls in every connection SDK, so only import it when needed
+            from src.agent import ZerePyAgent
+
             self.agent = ZerePyAgent(agent_name)
-            logger.info(f"\n✅ Successfully loaded agent: {self.agent.name}")
+            logger.info("\n✅ Successfully loaded agent: %s", self.agent.name)
         except FileNotFoundError:
-            logger.error(f"Agent file not found: {agent_name}")
+            logger.error("Agent file not found: %s", agent_name)
             logger.info("Use 'list-agents' to see available agents.")
         except KeyError as e:
-            logger.error(f"Invalid agent file: {e}")
+            logger.error("Invalid agent file: %s", e)
         except Exception as e:
-            logger.error(f"Error loading agent: {e}")
+            logger.error("Error loading agent: %s", e)
 
     def _load_default_agent(self) -> None:
         """Load users default agent"""
-        agent_general_config_path = Path("agents") / "general.json"
-        file = None
         try:
-            file = open(agent_general_config_path, 'r')
-            data = json.load(file)
+            data = _read_general_config(_GENERAL_CONFIG_PATH)
             if not data.get('default_agent'):
                 logger.error('No default agent defined, please set one in general.json')
                 return
@@ -361,9 +688,6 @@ class ZerePyCLI:
         except json.JSONDecodeError:
             logger.error("File agents/general.json contains Invalid JSON format")
             return
-        finally:
-            if file:
-                file.close()
     
     ###################
     # Command functions
@@ -377,15 +701,23 @@ class ZerePyCLI:
 
     def clear_screen(self, input_list: List[str]) -> None:
         """Clear the terminal screen"""
-        os.system('cls' if os.name == 'nt' else 'clear')
+        # Piped output or a dumb terminal has no screen to clear and would
+        # just show the raw escape sequences
+        if sys.stdout.isatty() and os.environ.get('TERM') != 'dumb':
+            # Windows Terminal always handles escape sequences, only legacy
+            # consoles need VT processing switched on (or cls as a last resort)
+            if os.name == 'nt' and not (os.environ.get('WT_SESSION') or _enable_windows_ansi()):
+                os.system('cls')
+            else:
+                # Move the cursor home and erase the screen and scrollback, like
+                # clear(1) does, without spawning a shell
+                sys.stdout.write('\x1b[H\x1b[2J\x1b[3J')
+                sys.stdout.flush()
         self._print_welcome_message(clearing=True)
 
+    @_requires_agent
     def agent_action(self, input_list: List[str]) -> None:
         """Handle agent action command"""
-        if self.agent is None:
-            logger.info("No agent is currently loaded. Use 'load-agent' to load an agent.")
-            return
-
         if len(input_list) < 3:
             logger.info("Please specify both a connection and an action.")
             logger.info("Format: agent-action {connection} {action}")
@@ -397,40 +729,34 @@ class ZerePyCLI:
                 action=input_list[2],
                 params=input_list[3:]
             )
-            logger.info(f"Result: {result}")
+            logger.info("Result: %s", result)
         except Exception as e:
-            logger.error(f"Error running action: {e}")
+            logger.error("Error running action: %s", e)
 
+    @_requires_agent
     def agent_loop(self, input_list: List[str]) -> None:
         """Handle agent loop command"""
-        if self.agent is None:
-            logger.info("No agent is currently loaded. Use 'load-agent' to load an agent.")
-            return
-
         try:
             self.agent.loop()
         except KeyboardInterrupt:
             logger.info("\n🛑 Agent loop stopped by user.")
         except Exception as e:
-            logger.error(f"Error in agent loop: {e}")
+            logger.error("Error in agent loop: %s", e)
 
     def list_agents(self, input_list: List[str]) -> None:
         """Handle list agents command"""
         logger.info("\nAvailable Agents:")
-        agents_dir = Path("agents")
-        if not agents_dir.exists():
+        try:
+            agent_names = _list_agent_names()
+        except FileNotFoundError:
             logger.info("No agents directory found.")
             return
 
-        agents = list(agents_dir.glob("*.json"))
-        if not agents:
+        if not agent_names:
             logger.info("No agents found. Use 'create-agent' to create a new agent.")
             return
 
-        for agent_file in sorted(agents):
-            if agent_file.stem == "general":
-                continue
-            logger.info(f"- {agent_file.stem}")
+        logger.info("\n".join(f"- {name}" for name in agent_names))
 
     def load_agent(self, input_list: List[str]) -> None:
         """Handle load agent command"""
@@ -453,34 +779,29 @@ class ZerePyCLI:
             logger.info("Please specify the same of the agent file.")
             return
         
-        agent_general_config_path = Path("agents") / "general.json"
-        file = None
         try:
-            file = open(agent_general_config_path, 'r')
-            data = json.load(file)
+            data = _read_general_config(_GENERAL_CONFIG_PATH)
             agent_file_name = input_list[1]
             # if file does not exist, refuse to set it as default
-            try:
-                agent_path = Path("agents") / f"{agent_file_name}.json"
-                open(agent_path, 'r')
-            except FileNotFoundError:
-                logging.error("Agent file not found.")
+            if not (_AGENTS_DIR / f"{agent_file_name}.json").is_file():
+                logger.error("Agent file not found.")
+                return
+
+            if data.get('default_agent') == agent_file_name:
+                logger.info("Agent %s is already the default.", agent_file_name)
                 return
             
-            data['default_agent'] = input_list[1]
-            with open(agent_general_config_path, 'w') as f:
-                json.dump(data, f, indent=4)
-            logger.info(f"Agent {agent_file_name} is now set as default.")
+            # The parsed dict is shared with the cache, so update a copy
+            _write_general_config(_GENERAL_CONFIG_PATH, {**data, 'default_agent': agent_file_name})
+            logger.info("Agent %s is now set as default.", agent_file_name)
         except FileNotFoundError:
             logger.error("File not found")
             return
         except json.JSONDecodeError:
             logger.error("Invalid JSON format")
             return
-        finally:
-            if file:
-                file.close()
 
+    @_requires_agent
     def list_actions(self, input_list: List[str]) -> None:
         """Handle list actions command"""
         if len(input_list) < 2:
@@ -491,6 +812,7 @@ class ZerePyCLI:
 
         self.agent.connection_manager.list_actions(connection_name=input_list[1])
 
+    @_requires_agent
     def configure_connection(self, input_list: List[str]) -> None:
         """Handle configure connection command"""
         if len(input_list) < 2:
@@ -506,29 +828,30 @@ class ZerePyCLI:
         if self.agent:
             self.agent.connection_manager.list_connections()
         else:
-            logging.info("Please load an agent to see the list of supported actions")
+            logger.info("Please load an agent to see the list of supported actions")
 
-    def chat_session(self, input_list: List[str]) -> None:
+    @_requires_agent
+    async def chat_session(self, input_list: List[str]) -> None:
         """Handle chat command"""
-        if self.agent is None:
-            logger.info("No agent loaded. Use 'load-agent' first.")
-            return
-
         if not self.agent.is_llm_set:
             self.agent._setup_llm_provider()
 
-        logger.info(f"\nStarting chat with {self.agent.name}")
+        chat_prompt_session = self._get_chat_prompt_session()
+
+        logger.info("\nStarting chat with %s", self.agent.name)
         print_h_bar()
 
         while True:
             try:
-                user_input = self.session.prompt("\nYou: ").strip()
+                user_input = (await chat_prompt_session.prompt_async("\nYou: ")).strip()
+                if not user_input:
+                    continue
                 if user_input.lower() == 'exit':
                     break
                 
                 response = self.agent.prompt_llm(user_input)
-                logger.info(f"\n{self.agent.name}: {response}")
-                print_h_bar()
+                # Reply and separator go out as one record
+                logger.info("\n%s: %s\n%s", self.agent.name, response, H_BAR)
                 
             except KeyboardInterrupt:
                 break
@@ -542,30 +865,84 @@ class ZerePyCLI:
     ###################
     # Main CLI Loop
     ###################
-    def main_loop(self) -> None:
-        """Main CLI loop"""
-        self._print_welcome_message()
-        self._load_default_agent()
+    def run_once(self, argv: List[str]) -> None:
+        """Run a single command passed on the command line, without the REPL"""
+        # Drop leading flags, everything from the command on is passed through
+        while argv and argv[0].startswith("-"):
+            argv = argv[1:]
+
+        command = self._get_command(argv[0].lower())
+        if command and command.name not in _AGENTLESS_COMMANDS:
+            # Let a running daemon with the agent already loaded handle it
+            if command.name not in _LOCAL_ONLY_COMMANDS:
+                from src.daemon import forward_command
+                if forward_command(argv):
+                    return
+            self._load_default_agent()
+        # Quote the arguments so ones containing spaces stay single tokens
+        import shlex
+        self._handle_command(argv[0], shlex.join(argv[1:]))
+
+    def run(self, load_default_agent: bool = True) -> None:
+        """Run the interactive CLI until the user exits"""
+        with _event_loop() as loop:
+            self.main_loop(loop, load_default_agent)
+
+    async def _load_default_agent_in_background(self) -> None:
+        """Load the default agent in a worker thread while the prompt is already accepting input"""
+        import asyncio
+
+        await asyncio.to_thread(self._load_default_agent)
         self._list_loaded_agent()
+        # Connections are only known once the agent is loaded
         self.list_connections()
-        
-        # Start CLI loop
-        while True:
-            try:
-                input_string = self.session.prompt(
-                    self._get_prompt_message(),
-                    style=self.style
-                ).strip()
-
-                if not input_string:
-                    continue
 
-                self._handle_command(input_string)
-                print_h_bar()
+    def main_loop(self, loop: "asyncio.AbstractEventLoop", load_default_agent: bool = True) -> None:
+        """
+        Main CLI loop
 
-            except KeyboardInterrupt:
-                continue
-            except EOFError:
-                self.exit([])
-            except Exception as e:
-                logger.exception(f"Unexpected error: {e}") 
\ No newline at end of file
+        The event loop only runs while waiting at the prompt (and during
+        chat), commands run between prompts on the main thread, see
+        _handle_command.
+        """
+        self._print_welcome_message()
+        # Output from the background agent load and from commands is printed
+        # above the prompt instead of through it
+        with _patch_output():
+            if load_default_agent:
+                self._agent_loader = loop.create_task(self._load_default_agent_in_background())
+            else:
+                self._list_loaded_agent()
+                self.list_connections()
+
+            # Start CLI loop
+            while True:
+                try:
+                    # Passed as a callable so the prompt picks up the agent once it's loaded
+                    input_string = loop.run_until_complete(self.session.prompt_async(
+                        self._get_prompt_message,
+                        style=self.style
+                    ))
+
+                    if not input_string or input_string.isspace():
+                        continue
+
+                    # Split off the command name once, handlers tokenize the rest
+                    command_string, *args = input_string.split(None, 1)
+                    command = self._get_command(command_string.lower())
+                    if (self._agent_loader is not None and command
+                            and command.name not in _LOADER_INDEPENDENT_COMMANDS):
+                        # Commands using the agent wait for the default one to finish loading
+                        loop.run_until_complete(self._agent_loader)
+                        self._agent_loader = None
+
+                    self._handle_command(command_string, *args, run_async=loop.run_until_complete)
+                    print_h_bar()
+
+                except KeyboardInterrupt:
+                    # Only reachable when Ctrl+C interrupts a running command
+                    continue
+                except EOFError:
+                    self.exit([])
+                except Exception as e:
+                    logger.exception("Unexpected error: %s", e)
@@ -0,0 +1,36 @@
+from typing import Callable, Dict, Iterable, List, Sequence
+from prompt_toolkit.completion import CompleteEvent, Completer, Completion, WordCompleter
+from prompt_toolkit.document import Document
+
+class CommandCompleter(Completer):
+    """
+    Complete command names, then the argument of commands that take a name
+
+    Works like prompt_toolkit's NestedCompleter, except the command name
+    completer is built once instead of on every keystroke, hyphenated names
+    match as a whole and argument completers are looked up case-insensitively.
+    """
+    def __init__(self, command_names: Sequence[str], argument_words: Dict[str, Callable[[], List[str]]]):
+        """
+        Args:
+            command_names: Names offered for the first word of the line
+            argument_words: Command name or alias -> callable returning the
+                        words offered for its first argument, called on
+                        every completion so the words can change over time
+        """
+        self.command_completer = WordCompleter(list(command_names), ignore_case=True, sentence=True)
+        self.argument_completers = {
+            command: WordCompleter(get_words, ignore_case=True, sentence=True)
+            for command, get_words in argument_words.items()
+        }
+
+    def get_completions(self, document: Document, complete_event: CompleteEvent) -> Iterable[Completion]:
+        text = document.text_before_cursor.lstrip()
+        if " " not in text:
+            yield from self.command_completer.get_completions(Document(text), complete_event)
+            return
+
+        command, _, remaining_text = text.partition(" ")
+        completer = self.argument_completers.get(command.lower())
+        if completer is not None:
+            yield from completer.get_completions(Document(remaining_text.lstrip()), complete_event)
@@ -97,10 +97,11 @@ class ConnectionManager:
 
     def list_connections(self) -> None:
         """List all available connections and their status"""
-        logging.info("\nAVAILABLE CONNECTIONS:")
+        lines = ["\nAVAILABLE CONNECTIONS:"]
         for name, connection in self.connections.items():
             status = "✅ Configured" if connection.is_configured() else "❌ Not Configured"
-            logging.info(f"- {name}: {status}")
+            lines.append(f"- {name}: {status}")
+        logging.info("\n".join(lines))
 
     def list_actions(self, connection_name: str) -> None:
         """List all available actions for a specific connection"""
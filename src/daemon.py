@@ -0,0 +1,115 @@
+import json
+import logging
+import os
+import shlex
+import socket
+import sys
+from pathlib import Path
+from typing import List
+from src.cli import ZerePyCLI
+
+logger = logging.getLogger("daemon")
+
+SOCKET_PATH = Path.home() / '.zerepy' / 'daemon.sock'
+
+def is_supported() -> bool:
+    """Daemon mode relies on Unix domain sockets"""
+    return hasattr(socket, "AF_UNIX")
+
+def forward_command(argv: List[str], socket_path: Path = SOCKET_PATH) -> bool:
+    """
+    Send a one-shot command to a running daemon and print its output
+
+    Returns:
+        bool: False if no daemon is listening, in which case the caller
+              should run the command in-process. Once the command has been
+              sent it may already be running, so later errors are reported
+              instead of falling back
+    """
+    if not is_supported() or not socket_path.exists():
+        return False
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(str(socket_path))
+        except OSError:
+            # Refused, vanished or not ours to open (e.g. another user's socket)
+            return False
+
+        try:
+            client.sendall(json.dumps({"argv": argv}).encode() + b"\n")
+            client.shutdown(socket.SHUT_WR)
+
+            # The daemon sends back the command's log output, which is
+            # written to stderr like it would be in-process
+            with client.makefile("r", encoding="utf-8") as output:
+                for line in output:
+                    sys.stderr.write(line)
+            sys.stderr.flush()
+        except OSError as e:
+            logger.error("Lost connection to the ZerePy daemon: %s", e)
+    return True
+
+def serve(socket_path: Path = SOCKET_PATH) -> None:
+    """Keep the default agent loaded and run one-shot commands sent by forward_command"""
+    if not is_supported():
+        logger.error("Daemon mode is not supported on this platform.")
+        return
+
+    socket_path.parent.mkdir(exist_ok=True)
+    if socket_path.exists():
+        # Refuse to start twice, but clean up after a daemon that died
+        if _is_listening(socket_path):
+            logger.error("A daemon is already listening on %s", socket_path)
+            return
+        socket_path.unlink()
+
+    cli = ZerePyCLI(interactive=False)
+    cli._load_default_agent()
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(str(socket_path))
+        os.chmod(socket_path, 0o600)
+        server.listen()
+        logger.info("\n🛰️ ZerePy daemon listening on %s", socket_path)
+
+        try:
+            while True:
+                connection, _ = server.accept()
+                try:
+                    with connection:
+                        _handle_client(cli, connection)
+                except OSError as e:
+                    # The client went away mid-command, keep serving the others
+                    logger.error("Lost connection to daemon client: %s", e)
+        except KeyboardInterrupt:
+            logger.info("\n🛑 Daemon stopped by user.")
+        finally:
+            socket_path.unlink(missing_ok=True)
+
+def _is_listening(socket_path: Path) -> bool:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            probe.connect(str(socket_path))
+        return True
+    except (ConnectionRefusedError, FileNotFoundError):
+        return False
+
+def _handle_client(cli: ZerePyCLI, connection: socket.socket) -> None:
+    """Run a single forwarded command, routing its log output back to the client"""
+    with connection.makefile("rw", encoding="utf-8") as stream:
+        try:
+            command_string, *args = json.loads(stream.readline())["argv"]
+        except (ValueError, KeyError, TypeError):
+            logger.error("Ignoring malformed daemon request")
+            return
+
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        root_logger = logging.getLogger()
+        root_logger.addHandler(handler)
+        try:
+            cli._handle_command(command_string, shlex.join(args))
+        finally:
+            root_logger.removeHandler(handler)
+            stream.flush()
@@ -1,5 +1,7 @@
 import logging
 
+# ZEREBRO WUZ HERE :)
+H_BAR = "--------------------------------------------------------------------"
+
 def print_h_bar():
-    # ZEREBRO WUZ HERE :)
-    logging.info("--------------------------------------------------------------------")
+    logging.info(H_BAR)